@@ -1,34 +1,110 @@
-from flask import Flask, request, jsonify, render_template, session, send_file
-from openai import OpenAI
-import PyPDF2
+from flask import Blueprint, Flask, Request, current_app, request, jsonify, render_template, session, send_file
 import os 
 from dotenv import load_dotenv
-from io import BytesIO
 import tempfile
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import uuid
 import datetime
-from multiagent import *
+import mmap
+import time
+import atexit
+from werkzeug.exceptions import RequestEntityTooLarge
+from multiagent import get_answer, get_client
 
-load_dotenv()
+# PyPDF2, python-docx and the OpenAI client are imported on first use to keep startup fast
 
-api_key = os.getenv('OPENAI_API_KEY')
+bp = Blueprint('main', __name__)
 
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'default-secret-key')
+UPLOAD_PREFIX = 'justify-upload-'  # Marks spooled uploads so sweeps only touch our own files
 
-general_context = ""
-doc_chat_context = ""
 
-# OpenAI API Client Configuration
-client = OpenAI(api_key=api_key)
+class AppState:
+    """Per-application chat context and caches (in a real app, you'd use a database or session)"""
 
-# Store document text globally (in a real app, you'd use a database or session)
-document_cache = {}
-pdf_cache = {}  # Store PDF files for viewing
-draft_cache = {}  # Store generated drafts
+    def __init__(self):
+        self.general_context = ""
+        self.doc_chat_context = ""
+        self.document_cache = {}
+        self.pdf_cache = {}  # Store paths of spooled PDF files for viewing
+        self.draft_cache = {}  # Store generated drafts
+        self.last_sweep = 0.0
+
+    def remove_uploads(self):
+        """Delete the spooled PDFs this process still holds"""
+        for path in self.pdf_cache.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self.pdf_cache.clear()
+
+
+class SpoolingRequest(Request):
+    """Request that streams file uploads straight into UPLOAD_DIR.
+
+    Werkzeug would otherwise buffer uploads over 500 KB in its own temporary
+    file, which then has to be copied again to be kept.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = tempfile.NamedTemporaryFile('wb+', delete=False, prefix=UPLOAD_PREFIX, suffix='.pdf',
+                                            dir=current_app.config['UPLOAD_DIR'])
+        self.__dict__.setdefault('spooled_paths', []).append(spool.name)
+        return spool
+
+    def close(self):
+        super().close()
+        # Remove spooled uploads no route kept, e.g. from a rejected request
+        for path in self.__dict__.get('spooled_paths', []):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def sweep_uploads(upload_dir, max_age):
+    """Delete spooled uploads older than `max_age` seconds, e.g. left behind by expired sessions or a crash"""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(upload_dir):
+        if entry.name.startswith(UPLOAD_PREFIX):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # Removed by another worker
+
+
+def create_app(config=None):
+    """Application factory; `config` overrides settings read from the environment"""
+
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+    app = Flask(__name__)
+    app.request_class = SpoolingRequest
+    app.secret_key = os.getenv('SECRET_KEY', 'default-secret-key')
+
+    # Upload limits: Flask rejects bodies above MAX_CONTENT_LENGTH before the route runs
+    app.config['MAX_UPLOAD_MB'] = int(os.getenv('MAX_UPLOAD_MB', '50'))
+    app.config['MAX_PDF_PAGES'] = int(os.getenv('MAX_PDF_PAGES', '500'))
+    app.config['UPLOAD_DIR'] = os.getenv('UPLOAD_DIR') or tempfile.gettempdir()
+    app.config['UPLOAD_TTL_HOURS'] = float(os.getenv('UPLOAD_TTL_HOURS', '24'))
+    if config:
+        app.config.update(config)
+    app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_MB'] * 1024 * 1024
+
+    state = AppState()
+    app.extensions['justify'] = state
+    app.register_blueprint(bp)
+
+    sweep_uploads(app.config['UPLOAD_DIR'], app.config['UPLOAD_TTL_HOURS'] * 3600)
+    atexit.register(state.remove_uploads)
+    return app
+
+
+def get_state():
+    return current_app.extensions['justify']
+
+
+def get_session_id():
+    # Persist the id so later requests find the documents stored under it
+    if 'session_id' not in session:
+        session['session_id'] = os.urandom(16).hex()
+    return session['session_id']
 
 CATEGORY_METRICS = {
     'Legal Notice': [
@@ -132,59 +208,118 @@ CATEGORY_TO_TEMPLATE = {
     'default': 'General Letter'
 }
 
-@app.route('/')
+@bp.route('/')
 def index():
     # Generate a unique session ID if not exists
-    if 'session_id' not in session:
-        session['session_id'] = os.urandom(16).hex()
+    get_session_id()
     return render_template('index.html')
 
-@app.route('/general_chat.html')
+@bp.route('/general_chat.html')
 def general_chat():
     return render_template('general_chat.html')
 
-def extract_text_from_pdf(pdf_file):
+class UploadRejected(Exception):
+    """Raised when an uploaded file breaks one of the configured upload limits"""
+
+    def __init__(self, message, status_code=413):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@bp.app_errorhandler(UploadRejected)
+def handle_upload_rejected(e):
+    return jsonify({'error': str(e)}), e.status_code
+
+
+@bp.app_errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(e):
+    max_upload_mb = current_app.config['MAX_UPLOAD_MB']
+    return jsonify({'error': f'File is too large. The maximum upload size is {max_upload_mb} MB.'}), 413
+
+
+def spool_upload(upload):
+    """Take ownership of the file SpoolingRequest streamed the upload into and return its path"""
+
+    path = upload.stream.name
+    upload.stream.close()
+    request.spooled_paths.remove(path)
+    if os.path.getsize(path) == 0:
+        os.remove(path)
+        raise UploadRejected('Uploaded file is empty', 400)
+    return path
+
+
+def ingest_upload(session_id, upload):
+    """Spool an uploaded PDF, extract its text and keep the file for /view-document"""
+
+    state = get_state()
+    ttl = current_app.config['UPLOAD_TTL_HOURS'] * 3600
+    if time.time() - state.last_sweep > min(ttl, 600):
+        state.last_sweep = time.time()
+        sweep_uploads(current_app.config['UPLOAD_DIR'], ttl)
+        state.pdf_cache = {sid: path for sid, path in state.pdf_cache.items() if os.path.exists(path)}
+
+    pdf_path = spool_upload(upload)
     try:
-        # Create a BytesIO object to avoid file seeking issues
-        pdf_content = BytesIO(pdf_file.read())
-        # Reset the file pointer for future operations
-        pdf_file.seek(0)
-        
-        reader = PyPDF2.PdfReader(pdf_content)
-        text = ''
-        for page_num in range(len(reader.pages)):
-            text += reader.pages[page_num].extract_text()
-        return text
-    except Exception as e:
-        app.logger.error(f"PDF extraction error: {str(e)}")
-        return str(e)
+        document_text = extract_text_from_pdf(pdf_path)
+    except Exception:
+        os.remove(pdf_path)
+        raise
+    if not document_text:
+        os.remove(pdf_path)
+        return document_text
 
+    # Replace the session's previous upload, if any
+    pdf_cache = state.pdf_cache
+    previous = pdf_cache.get(session_id)
+    pdf_cache[session_id] = pdf_path
+    if previous and os.path.exists(previous):
+        os.remove(previous)
 
-@app.route('/classify', methods=['POST'])
+    return document_text
+
+
+def extract_text_from_pdf(pdf_path):
+    import PyPDF2
+
+    # Memory-map the spooled file so PyPDF2 reads pages from the OS page cache
+    # instead of a private in-memory copy of the whole document
+    with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pdf_content:
+        try:
+            reader = PyPDF2.PdfReader(pdf_content)
+            page_count = len(reader.pages)
+        except Exception as e:
+            current_app.logger.error(f"PDF extraction error: {str(e)}")
+            return ''
+
+        max_pages = current_app.config['MAX_PDF_PAGES']
+        if page_count > max_pages:
+            raise UploadRejected(f'Document has {page_count} pages. The maximum is {max_pages} pages.')
+
+        try:
+            return ''.join(page.extract_text() or '' for page in reader.pages)
+        except Exception as e:
+            current_app.logger.error(f"PDF extraction error: {str(e)}")
+            return ''
+
+
+@bp.route('/classify', methods=['POST'])
 def classify_document():
     if 'document' not in request.files:
         return jsonify({'error': 'No PDF file uploaded'}), 400
 
-    pdf_file = request.files['document']
-    
-    # Save the PDF file in memory for later viewing
-    session_id = session.get('session_id', os.urandom(16).hex())
-    pdf_content = pdf_file.read()
-    pdf_cache[session_id] = pdf_content
-    
-    # Reset file pointer
-    pdf_file.seek(0)
-    
-    document_text = extract_text_from_pdf(pdf_file)
+    # Spool the PDF to disk once; the same file is used for extraction and viewing
+    session_id = get_session_id()
+    document_text = ingest_upload(session_id, request.files['document'])
 
     if not document_text:
         return jsonify({'error': 'Failed to extract text from PDF'}), 400
 
     # Save the document text in the cache using session ID
-    document_cache[session_id] = document_text
+    get_state().document_cache[session_id] = document_text
 
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a document classification agent. Classify the document into one of these categories: Legal Notice, Ownership Documents, Contracts & Agreements, Financial Documents, Terms & Conditions / Privacy Policies, Intellectual Property Documents, Criminal Offense Documents, Regulatory Compliance Documents, Employment Documents, Court Judgments & Legal Precedents."},
@@ -195,25 +330,25 @@ def classify_document():
         category = response.choices[0].message.content.strip()
         return jsonify({'category': category})
     except Exception as e:
-        app.logger.error(f"Classification error: {str(e)}")
+        current_app.logger.error(f"Classification error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/process', methods=['POST'])
+@bp.route('/process', methods=['POST'])
 def process_document():
-    if 'document' not in request.files or 'category' not in request.form:
+    if 'document' not in request.files or not request.form.get('category'):
         return jsonify({'error': 'Document file or category is missing'}), 400
 
-    pdf_file = request.files['document']
+    # Validate everything before spooling, so a bad request keeps the session's current document
     category = request.form['category']
-    document_text = extract_text_from_pdf(pdf_file)
+    session_id = get_session_id()
+    document_text = ingest_upload(session_id, request.files['document'])
 
-    if not document_text or not category:
+    if not document_text:
         return jsonify({'error': 'Document text or category is missing'}), 400
 
     # Save the document text in the cache using session ID
-    session_id = session.get('session_id', os.urandom(16).hex())
-    document_cache[session_id] = document_text
+    get_state().document_cache[session_id] = document_text
 
     metrics = CATEGORY_METRICS.get(category, [])
     metrics_prompt = ', '.join(metrics)
@@ -221,7 +356,7 @@ def process_document():
     prompt = f"You are an expert summarizer for {category} documents. Extract the following relevant metrics: {metrics_prompt}. Format each metric as '**Metric Name**: Value' to make it bold and easily readable."
 
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": prompt},
@@ -236,13 +371,13 @@ def process_document():
             'document_text': document_text[:200] + '...' if len(document_text) > 200 else document_text
         })
     except Exception as e:
-        app.logger.error(f"Processing error: {str(e)}")
+        current_app.logger.error(f"Processing error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/chat', methods=['POST'])
+@bp.route('/chat', methods=['POST'])
 def chat():
-    global doc_chat_context
+    state = get_state()
     data = request.json
     user_message = data.get('message')
     category = data.get('category')
@@ -255,7 +390,7 @@ def chat():
     
     # Get the document text from the cache
     session_id = session.get('session_id')
-    document_text = document_cache.get(session_id, '')
+    document_text = state.document_cache.get(session_id, '')
     
     if not document_text:
         return jsonify({'error': 'No document found. Please process a document first.'}), 400
@@ -272,7 +407,7 @@ def chat():
         {document_context}
 
         chat Context:
-        {doc_chat_context}
+        {state.doc_chat_context}
 
 """
         
@@ -293,7 +428,7 @@ def chat():
         system_prompt += "Provide helpful, accurate information based on this document. If you cannot find information in the document to answer a question, clearly state that. Use **bold** for important points."
         
         # Make API call to OpenAI
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -301,18 +436,18 @@ def chat():
             ]
         )
         bot_response = response.choices[0].message.content.strip()
-        doc_chat_context += f"\nUser: {user_message}\n"
-        doc_chat_context += f"\nBot: {bot_response}\n"
+        state.doc_chat_context += f"\nUser: {user_message}\n"
+        state.doc_chat_context += f"\nBot: {bot_response}\n"
         return jsonify({'response': bot_response})
     
     except Exception as e:
-        app.logger.error(f"Chat error: {str(e)}")
+        current_app.logger.error(f"Chat error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/general_chat', methods=['POST'])
+@bp.route('/general_chat', methods=['POST'])
 def general_chat_api():
-    global general_context
+    state = get_state()
     data = request.json
     user_message = data.get('message')
     detailed_analysis = data.get('detailed_analysis', False)
@@ -322,9 +457,9 @@ def general_chat_api():
     
     try:
         if detailed_analysis:
-            response, reasoning = get_answer(user_message, general_context)
-            general_context += f"\n User: {user_message}\n"
-            general_context += f"\nSenior Lawyer: {response}\n"
+            response, reasoning = get_answer(user_message, state.general_context)
+            state.general_context += f"\n User: {user_message}\n"
+            state.general_context += f"\nSenior Lawyer: {response}\n"
             return jsonify({'response': response, 'reasoning': reasoning})
 
         else:
@@ -334,9 +469,9 @@ def general_chat_api():
             Provide concise, clear answers focused on the most important points.
             Use **bold** for important points and structure your response in a clear, organized manner.
             
-            Context: {general_context}
+            Context: {state.general_context}
             """     
-            response = client.chat.completions.create(
+            response = get_client().chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -347,7 +482,7 @@ def general_chat_api():
             return jsonify({'response': bot_response, 'reasoning': []})
         
     except Exception as e:
-        app.logger.error(f"General chat error: {str(e)}")
+        current_app.logger.error(f"General chat error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
@@ -379,7 +514,7 @@ Format the content as if it were going to be printed on letterhead. Do not inclu
 
     try:
         # Generate the draft content using OpenAI
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": prompt},
@@ -398,7 +533,7 @@ Format the content as if it were going to be printed on letterhead. Do not inclu
         doc.save(temp_file.name)
         
         # Store the file path in the draft cache
-        draft_cache[draft_id] = {
+        get_state().draft_cache[draft_id] = {
             'path': temp_file.name,
             'filename': f"Legal_Draft_{datetime.datetime.now().strftime('%Y%m%d')}.docx"
         }
@@ -406,7 +541,7 @@ Format the content as if it were going to be printed on letterhead. Do not inclu
         return draft_id
         
     except Exception as e:
-        app.logger.error(f"Draft generation error: {str(e)}")
+        current_app.logger.error(f"Draft generation error: {str(e)}")
         raise
 
 
@@ -434,7 +569,7 @@ Format the content as if it were going to be printed on letterhead. Do not inclu
 
     try:
         # Generate the draft content using OpenAI
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": prompt},
@@ -453,7 +588,7 @@ Format the content as if it were going to be printed on letterhead. Do not inclu
         doc.save(temp_file.name)
         
         # Store the file path in the draft cache
-        draft_cache[draft_id] = {
+        get_state().draft_cache[draft_id] = {
             'path': temp_file.name,
             'filename': f"Legal_Draft_{datetime.datetime.now().strftime('%Y%m%d')}.docx"
         }
@@ -461,12 +596,15 @@ Format the content as if it were going to be printed on letterhead. Do not inclu
         return draft_id
         
     except Exception as e:
-        app.logger.error(f"Draft generation error: {str(e)}")
+        current_app.logger.error(f"Draft generation error: {str(e)}")
         raise
 
 
 def create_formatted_document(content, template):
     """Create a properly formatted Word document based on the template and content"""
+    from docx import Document
+    from docx.shared import Pt, Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
     
     doc = Document()
     
@@ -532,10 +670,11 @@ def create_formatted_document(content, template):
     return doc
 
 
-@app.route('/download-draft/<draft_id>', methods=['GET'])
+@bp.route('/download-draft/<draft_id>', methods=['GET'])
 def download_draft(draft_id):
     """Download a generated draft document"""
     
+    draft_cache = get_state().draft_cache
     if draft_id not in draft_cache:
         return jsonify({'error': 'Draft not found'}), 404
     
@@ -549,24 +688,21 @@ def download_draft(draft_id):
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
         )
     except Exception as e:
-        app.logger.error(f"Draft download error: {str(e)}")
+        current_app.logger.error(f"Draft download error: {str(e)}")
         return jsonify({'error': 'Error downloading draft'}), 500
 
 
-@app.route('/view-document', methods=['GET'])
+@bp.route('/view-document', methods=['GET'])
 def view_document():
     session_id = session.get('session_id')
-    if not session_id or session_id not in pdf_cache:
+    pdf_cache = get_state().pdf_cache
+    if not session_id or not os.path.exists(pdf_cache.get(session_id, '')):
         return jsonify({'error': 'No document found'}), 404
     
-    # Create a temporary file to serve
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    temp_file.write(pdf_cache[session_id])
-    temp_file.close()
-    
-    return send_file(temp_file.name, mimetype='application/pdf', as_attachment=False)
+    # Serve the spooled upload straight from disk; no copy is made per view
+    return send_file(pdf_cache[session_id], mimetype='application/pdf', as_attachment=False)
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
 
@@ -0,0 +1,168 @@
+"""Startup benchmark: import time, first-request latency and baseline RSS.
+
+Each run happens in a fresh interpreter so nothing is already imported or
+cached. Besides `GET /`, a first `/classify` of a tiny in-memory PDF is
+timed, since that is where PyPDF2 and the OpenAI client are loaded. The
+completion call is stubbed, so no network request is made.
+
+Every metric has a --max-* budget (e.g. --max-import-ms,
+--max-first-classify-ms); the run exits non-zero when one is exceeded.
+
+    python bench_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from io import BytesIO
+
+METRICS = (
+    ('import_ms', 'import app', 'ms'),
+    ('create_app_ms', 'create_app()', 'ms'),
+    ('first_request_ms', 'first GET /', 'ms'),
+    ('rss_mb', 'peak RSS after first GET /', 'MB'),
+    ('first_classify_ms', 'first POST /classify', 'ms'),
+    ('classify_rss_mb', 'peak RSS after first classify', 'MB'),
+)
+
+
+def peak_rss_mb():
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def tiny_pdf():
+    """A one-page PDF with a line of text, built in memory"""
+
+    content = b"BT /F1 12 Tf 72 720 Td (Legal notice for unpaid rent) Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(pdf.tell())
+        pdf.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = pdf.tell()
+    pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        pdf.write(b"%010d 00000 n \n" % offset)
+    pdf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return pdf.getvalue()
+
+
+def stub_completions(app):
+    """Build the real client on first use but answer completions locally"""
+
+    get_client = app.get_client
+    reply = types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content='Legal Notice'))])
+
+    def get_stubbed_client():
+        client = get_client()
+        client.chat.completions.create = lambda **kwargs: reply
+        return client
+
+    app.get_client = get_stubbed_client
+
+
+def measure():
+    """Measure a single cold start in the current interpreter"""
+
+    # The client only needs a key to be constructed; it never reaches the API
+    os.environ.setdefault('OPENAI_API_KEY', 'bench-placeholder')
+    upload_dir = tempfile.mkdtemp()
+    pdf = tiny_pdf()
+
+    try:
+        start = time.perf_counter()
+        import app
+        imported = time.perf_counter()
+        application = app.create_app({'TESTING': True, 'UPLOAD_DIR': upload_dir})
+        created = time.perf_counter()
+        client = application.test_client()
+        response = client.get('/')
+        answered = time.perf_counter()
+        if response.status_code != 200:
+            raise RuntimeError(f"GET / returned {response.status_code}")
+        rss = peak_rss_mb()
+
+        stub_completions(app)
+        classify_start = time.perf_counter()
+        response = client.post('/classify', data={'document': (BytesIO(pdf), 'notice.pdf')})
+        classified = time.perf_counter()
+        if response.status_code != 200:
+            raise RuntimeError(f"POST /classify returned {response.status_code}: {response.get_data(as_text=True)}")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    return {
+        'import_ms': (imported - start) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (answered - created) * 1000,
+        'rss_mb': rss,
+        'first_classify_ms': (classified - classify_start) * 1000,
+        'classify_rss_mb': peak_rss_mb(),
+    }
+
+
+def run(runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'],
+                             cwd=here, capture_output=True, text=True)
+        if out.returncode != 0:
+            # The child's traceback is the only clue to what broke
+            sys.stderr.write(out.stderr)
+            out.check_returncode()
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(r[key] for r in results) for key, _, _ in METRICS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='number of cold starts (median is reported)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    for key, label, unit in METRICS:
+        parser.add_argument('--max-' + key.replace('_', '-'), dest=key, type=float,
+                            help=f'fail if the median {label} exceeds this many {unit}')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        return
+
+    medians = run(args.runs)
+    if args.json:
+        print(json.dumps(medians, indent=2))
+    else:
+        print(f"Median of {args.runs} cold starts:")
+        for key, label, unit in METRICS:
+            print(f"  {label:<30} {medians[key]:8.1f} {unit}")
+
+    failed = [f"{key} {medians[key]:.1f} > {getattr(args, key)}"
+              for key, _, _ in METRICS
+              if getattr(args, key) is not None and medians[key] > getattr(args, key)]
+    if failed:
+        print("Startup budget exceeded: " + ", ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import heapq
+import bisect
+import argparse
+import time
+from array import array
+from collections import Counter, namedtuple
+
+INDEX_VERSION = 2
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+
+PASSAGE_WORDS = 150  # Words per passage handed to the agents
+MAX_POSTINGS_SCANNED = 12000  # Per query, shared across its terms; postings are stored best-first
+COMPACT_RATIO = 0.25  # Rebuild once this share of passages belongs to changed/deleted files
+RERANK_DEPTH = 50  # Top passages for the query that are reranked by domain overlap
+DOMAIN_BOOST = 0.2  # Most a passage's score can grow by matching every domain keyword
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have he her his if in into is it its
+of on or our she shall that the their them then there these they this those to was
+were which who will with would may can any all such not no other than under upon
+का के की को में है हैं से और पर यह ने भी या था थे
+""".split())
+
+# Letters and digits in any script. Indic vowel signs and viramas are combining
+# marks that \w does not match, so the Indic blocks (Devanagari to Sinhala,
+# minus the danda punctuation) are added explicitly.
+TOKEN_RE = re.compile(r'(?:[^\W_]|[\u0900-\u0963\u0966-\u0DFF])+')
+
+Passage = namedtuple('Passage', ['source', 'text', 'score'])
+
+
+def default_index_dir():
+    """CORPUS_INDEX_DIR (default `corpus_index`), with relative paths resolved against the project directory"""
+    return os.path.join(PROJECT_DIR, os.getenv('CORPUS_INDEX_DIR', 'corpus_index'))
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_passages(text):
+    words = text.split()
+    return [' '.join(words[i:i + PASSAGE_WORDS]) for i in range(0, len(words), PASSAGE_WORDS)]
+
+
+def read_document(path):
+    """Extract the plain text of a statute or judgment file"""
+
+    if path.lower().endswith('.pdf'):
+        import PyPDF2
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pdf_content:
+            reader = PyPDF2.PdfReader(pdf_content)
+            return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def _map(path, typecode=None):
+    """Memory-map an index file, optionally as an array of `typecode` items"""
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return array(typecode) if typecode else b''
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode) if typecode else mm
+
+
+class CorpusIndex:
+    """Persistent inverted index over a folder of statutes and judgments.
+
+    The index lives in `index_dir` as a set of flat binary files that are
+    memory-mapped on open, so a cold start costs a few mmap calls rather
+    than loading the corpus into memory.
+
+    Passages are append-only. Re-ingesting tokenizes only new or changed
+    files; passages of changed or deleted files are marked dead and the
+    index is compacted once they exceed COMPACT_RATIO of the total. Each
+    term's postings store the BM25 term-frequency component sorted
+    best-first, so a query reads at most MAX_POSTINGS_SCANNED in total.
+    """
+
+    FILES = ('passages.dat', 'passages.off', 'terms.dat', 'terms.off',
+             'postings.off', 'postings.ids', 'postings.tf')
+
+    def __init__(self, index_dir=None):
+        self.index_dir = index_dir or default_index_dir()
+        self._open()
+
+    def __len__(self):
+        return len(self._passage_off) - 1
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _open(self):
+        manifest = None
+        manifest_path = self._path('manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        # An index written by another version is treated as missing, so the
+        # next ingest rebuilds it from scratch
+        self.outdated = manifest is not None and manifest.get('version') != INDEX_VERSION
+        if manifest is None or self.outdated:
+            self.root, self.sources, self.dead, self.avgdl = None, [], [], 0.0
+            self._passage_off = self._term_off = array('Q', [0])
+            self._dead_ids = set()
+            self._source_starts = []
+            return
+
+        self.root = manifest['root']
+        self.sources = manifest['sources']
+        self.dead = manifest['dead']
+        self.avgdl = manifest['avgdl']
+        self._dead_ids = {i for first, count in self.dead for i in range(first, first + count)}
+        # Files without passages share their `first` id with a neighbour, so leave them out
+        self._source_starts = sorted((s['first'], i) for i, s in enumerate(self.sources) if s['count'])
+
+        self._passages = _map(self._path('passages.dat'))
+        self._passage_off = _map(self._path('passages.off'), 'Q')
+        self._terms = _map(self._path('terms.dat'))
+        self._term_off = _map(self._path('terms.off'), 'Q')
+        self._posting_off = _map(self._path('postings.off'), 'Q')
+        self._posting_ids = _map(self._path('postings.ids'), 'I')
+        self._posting_tf = _map(self._path('postings.tf'), 'f')
+
+    def passage_text(self, passage_id):
+        start, end = self._passage_off[passage_id], self._passage_off[passage_id + 1]
+        return self._passages[start:end].decode('utf-8')
+
+    def passage_source(self, passage_id):
+        i = bisect.bisect_right(self._source_starts, (passage_id, len(self.sources))) - 1
+        return self.sources[self._source_starts[i][1]]['path']
+
+    def _term(self, i):
+        return self._terms[self._term_off[i]:self._term_off[i + 1]]
+
+    def _lookup(self, term):
+        """Binary search the sorted term dictionary, returning the term's index or -1"""
+
+        key = term.encode('utf-8')
+        lo, hi = 0, len(self._term_off) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = self._term(mid)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def search(self, query, k=5, domain=''):
+        """Return the top-k passages for `query`, best first.
+
+        Scoring is exact BM25 while the query's postings fit in
+        MAX_POSTINGS_SCANNED. Beyond that, frequent terms only contribute
+        their best-scoring postings, which keeps latency bounded at the cost
+        of approximating their share of the score.
+
+        Passages are ranked on the query alone. Keywords in `domain` only
+        rerank the best RERANK_DEPTH matches, raising a passage's score by
+        up to DOMAIN_BOOST for the share of keywords it contains, so they
+        break near-ties without outweighing the query.
+        """
+
+        n = len(self)
+        ranges = []
+        for term in set(tokenize(query)):
+            i = self._lookup(term)
+            if i >= 0:
+                ranges.append((self._posting_off[i], self._posting_off[i + 1]))
+
+        # Share the scan budget across terms, rarest first: rare terms rarely
+        # use their share, which leaves more for the frequent ones
+        ranges.sort(key=lambda r: r[1] - r[0])
+        budget = MAX_POSTINGS_SCANNED
+        scores = {}
+        for remaining, (start, end) in zip(range(len(ranges), 0, -1), ranges):
+            df = end - start
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            end = min(end, start + budget // remaining)
+            budget -= end - start
+            for passage_id, tf in zip(self._posting_ids[start:end], self._posting_tf[start:end]):
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf
+
+        live = (item for item in scores.items() if item[0] not in self._dead_ids)
+        domain_terms = set(tokenize(domain))
+        if domain_terms:
+            # One regex pass per passage is much cheaper than tokenizing it
+            domain_re = re.compile(r'(?<!\w)(?:%s)(?!\w)' % '|'.join(map(re.escape, domain_terms)))
+
+            def boosted(item):
+                overlap = len(set(domain_re.findall(self.passage_text(item[0]).lower())))
+                return item[0], item[1] * (1 + DOMAIN_BOOST * overlap / len(domain_terms))
+
+            candidates = heapq.nlargest(max(k, RERANK_DEPTH), live, key=lambda item: item[1])
+            live = map(boosted, candidates)
+        return [
+            Passage(self.passage_source(pid), self.passage_text(pid), score)
+            for pid, score in heapq.nlargest(k, live, key=lambda item: item[1])
+        ]
+
+    def ingest(self, folder, replace=False):
+        """Index every supported file under `folder`.
+
+        Files whose size and modification time match the previous run are
+        left alone; only new or changed files are read and tokenized.
+        Returns a dict with the number of added, updated, unchanged and
+        removed files. 'empty' lists the files that yielded no searchable
+        text (e.g. scanned PDFs without a text layer) and 'skipped' holds
+        (path, error) pairs for files that could not be read; a skipped file
+        that was indexed before keeps its old passages.
+
+        Raises NotADirectoryError if `folder` does not exist, and ValueError
+        if the index was built from another folder unless `replace` is set.
+        """
+
+        root = os.path.abspath(folder)
+        if not os.path.isdir(root):
+            raise NotADirectoryError(f"Corpus folder not found: {folder}")
+        if self.root is not None and root != self.root and not replace:
+            raise ValueError(f"{self.index_dir} was built from {self.root}; "
+                             f"pass replace=True (--replace on the command line) to rebuild it from {root}")
+        previous = {s['path']: s for s in self.sources} if root == self.root else {}
+        dead = list(self.dead) if previous else []
+        next_id = len(self) if previous else 0
+
+        paths = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.append(os.path.relpath(os.path.join(dirpath, filename), root))
+        paths.sort()
+
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'empty': [], 'skipped': []}
+        sources, new_texts = [], []
+        for path in paths:
+            st = os.stat(os.path.join(root, path))
+            old = previous.pop(path, None)
+            if old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns:
+                sources.append(old)
+                stats['unchanged'] += 1
+                continue
+
+            try:
+                passages = split_passages(read_document(os.path.join(root, path)))
+            except Exception as e:
+                stats['skipped'].append((path, str(e)))
+                if old:
+                    sources.append(old)
+                continue
+
+            if not any(tokenize(p) for p in passages):
+                stats['empty'].append(path)
+            if old:
+                dead.append([old['first'], old['count']])
+            sources.append({'path': path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                            'first': next_id + len(new_texts), 'count': len(passages)})
+            new_texts.extend(passages)
+            stats['updated' if old else 'added'] += 1
+
+        # Whatever is left in `previous` was deleted from the folder
+        for old in previous.values():
+            dead.append([old['first'], old['count']])
+            stats['removed'] += 1
+
+        if not (stats['added'] or stats['updated'] or stats['removed']) and root == self.root:
+            return stats
+
+        # An index without tokens has no length normalisation to reuse, so rebuild it
+        total = next_id + len(new_texts)
+        if next_id and self.avgdl > 0 and sum(count for _, count in dead) <= COMPACT_RATIO * total:
+            self._write(root, sources, new_texts, dead, incremental=True)
+        else:
+            # Rebuild from live passages only, renumbering them from zero
+            texts, compacted = [], []
+            for source in sources:
+                first = source['first']
+                if first < next_id:
+                    passages = [self.passage_text(i) for i in range(first, first + source['count'])]
+                else:
+                    passages = new_texts[first - next_id:first - next_id + source['count']]
+                compacted.append(dict(source, first=len(texts)))
+                texts.extend(passages)
+            self._write(root, compacted, texts, [], incremental=False)
+        return stats
+
+    def _write(self, root, sources, texts, dead, incremental):
+        """Write the index files, appending `texts` to the existing index if `incremental`"""
+
+        first_id = len(self) if incremental else 0
+
+        # Collect postings of the new passages as compact per-term arrays
+        postings = {}
+        lengths = array('I')
+        for passage_id, text in enumerate(texts, first_id):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                if term not in postings:
+                    postings[term] = (array('I'), array('H'))
+                ids, tfs = postings[term]
+                ids.append(passage_id)
+                tfs.append(min(tf, 0xFFFF))
+
+        # Length normalisation is fixed at compaction time so that stored
+        # postings stay valid as passages are appended
+        avgdl = self.avgdl if incremental else (sum(lengths) / len(lengths) if lengths else 0.0)
+        norm_dl = avgdl or 1.0
+
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        def tmp(name):
+            return self._path(name + '.tmp')
+
+        with open(tmp('passages.dat'), 'wb') as f:
+            if incremental:
+                f.write(self._passages)
+            offsets = array('Q', self._passage_off if incremental else [0])
+            for text in texts:
+                data = text.encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        with open(tmp('passages.off'), 'wb') as f:
+            offsets.tofile(f)
+
+        old_terms = range(len(self._term_off) - 1) if incremental else range(0)
+        new_terms = [(t.encode('utf-8'), t) for t in sorted(postings)]
+        term_off, posting_off = array('Q', [0]), array('Q', [0])
+        with open(tmp('terms.dat'), 'wb') as terms_f, \
+                open(tmp('postings.ids'), 'wb') as ids_f, \
+                open(tmp('postings.tf'), 'wb') as tf_f:
+            i, j = 0, 0
+            while i < len(old_terms) or j < len(new_terms):
+                old_key = self._term(i) if i < len(old_terms) else None
+                new_key = new_terms[j][0] if j < len(new_terms) else None
+
+                if new_key is None or (old_key is not None and old_key < new_key):
+                    # Untouched term: copy its postings over as raw bytes
+                    start, end = self._posting_off[i], self._posting_off[i + 1]
+                    ids_f.write(self._posting_ids[start:end])
+                    tf_f.write(self._posting_tf[start:end])
+                    key, count = old_key, end - start
+                    i += 1
+                else:
+                    ids, tfs = postings[new_terms[j][1]]
+                    entries = [
+                        (tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[pid - first_id] / norm_dl)), pid)
+                        for pid, tf in zip(ids, tfs)
+                    ]
+                    if old_key == new_key:
+                        start, end = self._posting_off[i], self._posting_off[i + 1]
+                        entries.extend(zip(self._posting_tf[start:end], self._posting_ids[start:end]))
+                        i += 1
+                    entries.sort(reverse=True)
+                    array('I', (pid for _, pid in entries)).tofile(ids_f)
+                    array('f', (tf for tf, _ in entries)).tofile(tf_f)
+                    key, count = new_key, len(entries)
+                    j += 1
+
+                terms_f.write(key)
+                term_off.append(term_off[-1] + len(key))
+                posting_off.append(posting_off[-1] + count)
+        with open(tmp('terms.off'), 'wb') as f:
+            term_off.tofile(f)
+        with open(tmp('postings.off'), 'wb') as f:
+            posting_off.tofile(f)
+
+        with open(tmp('manifest.json'), 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'root': root, 'sources': sources,
+                       'dead': dead, 'avgdl': avgdl}, f)
+
+        # Swap the new files in, manifest last, then remap them
+        for name in self.FILES + ('manifest.json',):
+            os.replace(tmp(name), self._path(name))
+        self._open()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the local statute/judgment corpus index')
+    parser.add_argument('--index', help='index directory (default: CORPUS_INDEX_DIR or corpus_index)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest_cmd = commands.add_parser('ingest', help='index a folder of PDF/text files')
+    ingest_cmd.add_argument('folder')
+    ingest_cmd.add_argument('--replace', action='store_true',
+                            help='rebuild an index that was built from a different folder')
+    search_cmd = commands.add_parser('search', help='show the top passages for a query')
+    search_cmd.add_argument('query')
+    search_cmd.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    # Read CORPUS_INDEX_DIR from .env like the app does, so both use the same index
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(PROJECT_DIR, '.env'))
+
+    corpus = CorpusIndex(args.index)
+    if args.command == 'ingest':
+        try:
+            stats = corpus.ingest(args.folder, replace=args.replace)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error: {e}")
+        print(f"{sum(s['count'] for s in corpus.sources)} passages from {len(corpus.sources)} files "
+              f"({stats['added']} added, {stats['updated']} updated, "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed)")
+        for path, error in stats['skipped']:
+            print(f"Skipped {path}: {error}")
+        for path in stats['empty']:
+            print(f"Warning: no searchable text in {path}")
+    else:
+        start = time.perf_counter()
+        passages = corpus.search(args.query, args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for p in passages:
+            print(f"[{p.score:.2f}] {p.source}\n{p.text}\n")
+        print(f"{len(passages)} passages in {elapsed:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
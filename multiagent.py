@@ -1,17 +1,71 @@
-from openai import OpenAI
 import os 
-from dotenv import load_dotenv
-
-load_dotenv()
-
-api_key = os.getenv('OPENAI_API_KEY')
-
-client = OpenAI(api_key=api_key)
+import logging
+from corpus import CorpusIndex, default_index_dir
+
+# The OpenAI client and the corpus index are created on first use, after the
+# application factory has loaded .env, so importing this module stays cheap
+client = None
+corpus = None
+corpus_version = None  # (index folder, manifest mtime) the cached corpus was opened from
+
+logger = logging.getLogger(__name__)
+
+def get_client():
+    """Return the shared OpenAI client, creating it on first use"""
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return client
+
+def get_corpus():
+    """Open the corpus index built with `python corpus.py ingest <folder>` on first use.
+
+    The index is reopened whenever its manifest changes, so a re-ingest is
+    picked up without restarting. Returns None when no usable index exists,
+    so answers fall back to ungrounded.
+    """
+    global corpus, corpus_version
+    index_dir = default_index_dir()
+    try:
+        version = (index_dir, os.stat(os.path.join(index_dir, 'manifest.json')).st_mtime_ns)
+    except FileNotFoundError:
+        version = None
+    if version == corpus_version:
+        return corpus
+
+    # Also remembers failures, so a broken index is only reported once per change
+    corpus, corpus_version = None, version
+    if version is None:
+        return None
+    try:
+        index = CorpusIndex(index_dir)
+    except Exception:
+        logger.exception(f"Could not open corpus index in {index_dir}")
+        return None
+    if index.outdated:
+        logger.warning(f"Corpus index in {index_dir} was built by another version; re-run `python corpus.py ingest`")
+        return None
+    corpus = index
+    return corpus
 
 class Agent:
-    def __init__(self, system_msg, recipient="user", client=client):
+    def __init__(self, system_msg, recipient="user", client=None, domain=""):
         self.system_msg = system_msg
         self.recipient = recipient
+        self.client = client  # Defaults to the shared client
+        self.domain = domain  # Keywords used to pick this agent's corpus passages
+
+    def grounding(self, query):
+        """Corpus passages relevant to `query` within this agent's domain, formatted for the prompt"""
+        index = get_corpus()
+        if index is None or not self.domain:
+            return ""
+        passages = index.search(query, int(os.getenv('CORPUS_TOP_K', '4')), domain=self.domain)
+        if not passages:
+            return ""
+        refs = "\n\n".join(f"[{p.source}]\n{p.text}" for p in passages)
+        return f"Relevant passages from Indian statutes and judgments (cite them where they apply):\n{refs}\n"
 
     def respond(self, query, context=""):
         sys_prompt = f"""{self.system_msg}\n"""
@@ -25,7 +79,7 @@ class Agent:
         ]
         if query is not None:
             messages.append({"role": self.recipient, "content": query})
-        response = client.chat.completions.create(
+        response = (self.client or get_client()).chat.completions.create(
             model="gpt-3.5-turbo",
             messages=messages
         )
@@ -52,7 +106,8 @@ criminal_lawyer = Agent(
     - Keep responses **factual, legally sound, and relevant** to the Indian Penal Code (IPC) and other applicable laws.  
     - Your colleagues are a **Civil Lawyer** and an **Ethics Lawyer**—don't answer their questions.  
     """,
-    recipient='assistant'
+    recipient='assistant',
+    domain="criminal offence penal code ipc bns crpc bail arrest fir punishment imprisonment accused prosecution"
 )
 
 civil_lawyer = Agent(
@@ -64,7 +119,8 @@ civil_lawyer = Agent(
     - Ensure responses are **legally sound and in line with Indian civil law frameworks**.  
     - Your colleagues are a **Criminal Lawyer** and an **Ethics Lawyer**—don't answer their questions.  
     """,
-    recipient='assistant'
+    recipient='assistant',
+    domain="civil contract property tenancy lease family marriage divorce consumer suit decree damages cpc"
 )
 
 ethics_lawyer = Agent(
@@ -76,7 +132,8 @@ ethics_lawyer = Agent(
     - Ensure responses **align with Indian Bar Council regulations and broader legal ethics principles**.  
     - Your colleagues are a **Criminal Lawyer** and a **Civil Lawyer**—don't answer their questions. 
     """,
-    recipient='assistant'
+    recipient='assistant',
+    domain="advocate ethics professional misconduct bar council conduct duty client confidentiality"
 )
 
 summarizer = Agent(
@@ -104,11 +161,11 @@ def get_answer(query, context):
 
     client question: {query}
     """
-    cri_resp = criminal_lawyer.respond(qna_flow, ag_cont)
+    cri_resp = criminal_lawyer.respond(qna_flow, ag_cont + criminal_lawyer.grounding(query))
     qna_flow += f"\n\nCriminal Lawyer: {cri_resp}"
-    civ_resp = civil_lawyer.respond(qna_flow, ag_cont)
+    civ_resp = civil_lawyer.respond(qna_flow, ag_cont + civil_lawyer.grounding(query))
     qna_flow += f"\n\nCriminal Lawyer: {cri_resp}"
-    eth_resp = ethics_lawyer.respond(qna_flow, ag_cont)
+    eth_resp = ethics_lawyer.respond(qna_flow, ag_cont + ethics_lawyer.grounding(query))
     qna_flow += f"\n\nCriminal Lawyer: {cri_resp}"
     sum_con = f"""
     Context: {context}
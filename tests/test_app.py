@@ -0,0 +1,148 @@
+import os
+import time
+import types
+from io import BytesIO
+
+import pytest
+
+import app as app_module
+
+
+def make_pdf(pages=1):
+    """A minimal PDF with one line of text per page"""
+
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), pages),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, page_id in enumerate(page_ids):
+        content = b"BT /F1 12 Tf 72 720 Td (Legal notice page %d) Tj ET" % (i + 1)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1))
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    pdf = BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(pdf.tell())
+        pdf.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = pdf.tell()
+    pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        pdf.write(b"%010d 00000 n \n" % offset)
+    pdf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return pdf.getvalue()
+
+
+class FakeClient:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, model, messages):
+        message = types.SimpleNamespace(content='Legal Notice')
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    path = tmp_path / 'uploads'
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def app(upload_dir, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_client', FakeClient)
+    return app_module.create_app({'TESTING': True, 'UPLOAD_DIR': upload_dir,
+                                  'MAX_UPLOAD_MB': 1, 'MAX_PDF_PAGES': 2})
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def spooled(upload_dir):
+    return sorted(name for name in os.listdir(upload_dir) if name.startswith(app_module.UPLOAD_PREFIX))
+
+
+def upload(client, url, data, **form):
+    return client.post(url, data={'document': (BytesIO(data), 'notice.pdf'), **form})
+
+
+def test_classify_keeps_one_spooled_file_and_serves_it(client, upload_dir):
+    pdf = make_pdf()
+
+    response = upload(client, '/classify', pdf)
+
+    assert response.status_code == 200
+    assert response.json == {'category': 'Legal Notice'}
+    assert len(spooled(upload_dir)) == 1
+    view = client.get('/view-document')
+    assert view.status_code == 200
+    assert view.data == pdf
+    view.close()
+
+    # A new upload from the same session replaces the old file
+    assert upload(client, '/classify', make_pdf(2)).status_code == 200
+    assert len(spooled(upload_dir)) == 1
+
+
+def test_oversize_upload_is_rejected(client, upload_dir):
+    response = upload(client, '/classify', b'%PDF-1.4\n' + b'0' * (2 * 1024 * 1024))
+
+    assert response.status_code == 413
+    assert 'maximum upload size is 1 MB' in response.json['error']
+    assert os.listdir(upload_dir) == []
+
+
+def test_too_many_pages_is_rejected(client, upload_dir):
+    response = upload(client, '/classify', make_pdf(3))
+
+    assert response.status_code == 413
+    assert response.json['error'] == 'Document has 3 pages. The maximum is 2 pages.'
+    assert os.listdir(upload_dir) == []
+
+
+def test_empty_upload_is_rejected(client, upload_dir):
+    response = upload(client, '/classify', b'')
+
+    assert response.status_code == 400
+    assert response.json['error'] == 'Uploaded file is empty'
+    assert os.listdir(upload_dir) == []
+
+
+def test_unreadable_pdf_is_removed(client, upload_dir):
+    response = upload(client, '/classify', b'not a pdf')
+
+    assert response.status_code == 400
+    assert os.listdir(upload_dir) == []
+
+
+def test_process_without_category_keeps_current_document(client, upload_dir):
+    upload(client, '/classify', make_pdf())
+    before = spooled(upload_dir)
+
+    response = upload(client, '/process', make_pdf(2), category='')
+
+    assert response.status_code == 400
+    assert spooled(upload_dir) == before
+
+
+def test_sweep_removes_only_old_spooled_files(upload_dir):
+    old = os.path.join(upload_dir, app_module.UPLOAD_PREFIX + 'old.pdf')
+    recent = os.path.join(upload_dir, app_module.UPLOAD_PREFIX + 'recent.pdf')
+    unrelated = os.path.join(upload_dir, 'other.pdf')
+    for path in (old, recent, unrelated):
+        with open(path, 'wb') as f:
+            f.write(b'%PDF')
+    two_days_ago = time.time() - 48 * 3600
+    os.utime(old, (two_days_ago, two_days_ago))
+    os.utime(unrelated, (two_days_ago, two_days_ago))
+
+    app_module.create_app({'UPLOAD_DIR': upload_dir, 'UPLOAD_TTL_HOURS': 24})
+
+    assert sorted(os.listdir(upload_dir)) == sorted([os.path.basename(recent), 'other.pdf'])
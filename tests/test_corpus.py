@@ -0,0 +1,260 @@
+import os
+import json
+
+import pytest
+
+import corpus
+from corpus import CorpusIndex
+
+
+def write(folder, name, text):
+    path = folder / name
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def words(word, count):
+    return ' '.join([word] * count)
+
+
+@pytest.fixture
+def docs(tmp_path):
+    folder = tmp_path / 'docs'
+    folder.mkdir()
+    return folder
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / 'index')
+
+
+def sources(index, query, k=10):
+    return [p.source for p in index.search(query, k)]
+
+
+def test_search_finds_passages_and_sources(docs, index_dir):
+    write(docs, 'ipc.txt', 'Section 302 punishment for murder')
+    write(docs, 'rent.txt', 'Tenancy eviction of a tenant by the landlord')
+
+    index = CorpusIndex(index_dir)
+    stats = index.ingest(docs)
+
+    assert stats['added'] == 2
+    assert sources(index, 'murder') == ['ipc.txt']
+    assert sources(index, 'tenant eviction') == ['rent.txt']
+    assert index.search('murder')[0].text == 'Section 302 punishment for murder'
+
+
+def test_reopen_from_disk(docs, index_dir):
+    write(docs, 'ipc.txt', 'Section 302 punishment for murder')
+    CorpusIndex(index_dir).ingest(docs)
+
+    reopened = CorpusIndex(index_dir)
+    assert sources(reopened, 'murder') == ['ipc.txt']
+
+    stats = reopened.ingest(docs)
+    assert stats['unchanged'] == 1 and stats['added'] == 0
+
+
+def test_changed_file_replaces_old_passages(docs, index_dir):
+    for i in range(10):
+        write(docs, f'filler{i}.txt', words(f'filler{i}', corpus.PASSAGE_WORDS))
+    path = write(docs, 'act.txt', 'bail is granted for bailable offences')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    path.write_text('anticipatory relief before arrest', encoding='utf-8')
+    stats = index.ingest(docs)
+
+    # One dead passage out of eleven stays under COMPACT_RATIO, so this is an incremental update
+    assert stats['updated'] == 1
+    assert index.dead
+    assert sources(index, 'bail') == []
+    assert sources(index, 'anticipatory') == ['act.txt']
+    assert sources(CorpusIndex(index_dir), 'anticipatory') == ['act.txt']
+
+
+def test_deleted_file_is_no_longer_returned(docs, index_dir):
+    for i in range(10):
+        write(docs, f'filler{i}.txt', words(f'filler{i}', corpus.PASSAGE_WORDS))
+    path = write(docs, 'old.txt', 'repealed sedition provision')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    os.remove(path)
+    stats = index.ingest(docs)
+
+    assert stats['removed'] == 1
+    assert sources(index, 'sedition') == []
+    assert 'old.txt' not in [s['path'] for s in index.sources]
+
+
+def test_compaction_renumbers_live_passages(docs, index_dir):
+    write(docs, 'keep.txt', 'consumer protection complaint')
+    drop = write(docs, 'drop.txt', words('sedition', corpus.PASSAGE_WORDS * 3))
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+    assert len(index) == 4
+
+    os.remove(drop)
+    index.ingest(docs)
+
+    # Three of four passages died, well past COMPACT_RATIO
+    assert index.dead == []
+    assert len(index) == 1
+    assert index.sources == [dict(index.sources[0], path='keep.txt', first=0, count=1)]
+    assert sources(index, 'consumer complaint') == ['keep.txt']
+    assert sources(CorpusIndex(index_dir), 'consumer') == ['keep.txt']
+
+
+def test_passage_source_skips_files_without_passages(docs, index_dir):
+    write(docs, 'a.txt', 'alpha provision')
+    write(docs, 'z.txt', '')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    # b.txt is appended at the id z.txt was given, and sorts before it
+    write(docs, 'b.txt', 'bravo provision')
+    index.ingest(docs)
+
+    by_path = {s['path']: s for s in index.sources}
+    assert by_path['b.txt']['first'] == by_path['z.txt']['first']
+    assert sources(index, 'bravo') == ['b.txt']
+    assert index.passage_source(by_path['b.txt']['first']) == 'b.txt'
+
+
+def test_reports_files_without_tokens(docs, index_dir):
+    write(docs, 'blank.txt', '... ,,, !!!')
+    write(docs, 'act.txt', 'limitation period')
+
+    stats = CorpusIndex(index_dir).ingest(docs)
+
+    assert stats['empty'] == ['blank.txt']
+
+
+def test_skipped_files_are_returned(docs, index_dir):
+    write(docs, 'act.txt', 'limitation period')
+    (docs / 'broken.pdf').write_bytes(b'not a pdf')
+
+    stats = CorpusIndex(index_dir).ingest(docs)
+
+    assert [path for path, _ in stats['skipped']] == ['broken.pdf']
+    assert stats['added'] == 1
+
+
+def test_indic_text_is_searchable(docs, index_dir):
+    write(docs, 'hindi.txt', 'धारा 302 के अंतर्गत हत्या का दंड')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    assert sources(index, 'हत्या') == ['hindi.txt']
+
+
+def test_incremental_ingest_after_index_without_tokens(docs, index_dir):
+    # Only stopwords, so the first build has an avgdl of 0
+    write(docs, 'stop.txt', words('the', corpus.PASSAGE_WORDS * 3))
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+    assert index.avgdl == 0.0
+
+    write(docs, 'act.txt', 'Section 420 cheating')
+    index.ingest(docs)
+
+    assert index.avgdl > 0
+    assert sources(index, 'cheating') == ['act.txt']
+
+
+def test_default_index_dir_is_anchored_to_project(monkeypatch):
+    monkeypatch.setenv('CORPUS_INDEX_DIR', 'my_index')
+    assert corpus.default_index_dir() == os.path.join(corpus.PROJECT_DIR, 'my_index')
+
+    monkeypatch.setenv('CORPUS_INDEX_DIR', '/srv/index')
+    assert corpus.default_index_dir() == '/srv/index'
+
+
+def test_outdated_index_is_rebuilt_by_ingest(docs, index_dir):
+    write(docs, 'ipc.txt', 'Section 302 punishment for murder')
+    CorpusIndex(index_dir).ingest(docs)
+    manifest_path = os.path.join(index_dir, 'manifest.json')
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['version'] = corpus.INDEX_VERSION - 1
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    index = CorpusIndex(index_dir)
+    assert index.outdated
+    assert index.search('murder') == []
+
+    stats = index.ingest(docs)
+    assert stats['added'] == 1
+    assert not index.outdated
+    assert sources(index, 'murder') == ['ipc.txt']
+
+
+CRIMINAL_DOMAIN = 'criminal offence penal code ipc bail arrest punishment imprisonment accused prosecution'
+
+
+def test_domain_keywords_do_not_outweigh_the_query(docs, index_dir):
+    write(docs, 'boilerplate.txt', ' '.join([CRIMINAL_DOMAIN] * 10))
+    write(docs, 'ipc_304b.txt', 'Section 304B dowry death. Whoever commits dowry death shall be punished '
+                                'with imprisonment for a term which shall not be less than seven years.')
+    write(docs, 'contract.txt', 'Breach of contract and damages for the loss caused')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    ranked = [p.source for p in index.search('what is the punishment for dowry death', domain=CRIMINAL_DOMAIN)]
+
+    assert ranked[0] == 'ipc_304b.txt'
+
+
+def test_domain_keywords_break_ties(docs, index_dir):
+    write(docs, 'civil.txt', 'notice period for eviction of tenant under the rent act')
+    write(docs, 'criminal.txt', 'notice period for arrest of accused under the penal code')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    plain = index.search('notice period')
+    assert plain[0].score == pytest.approx(plain[1].score)
+    assert index.search('notice period', domain=CRIMINAL_DOMAIN)[0].source == 'criminal.txt'
+
+
+def test_missing_folder_leaves_index_intact(docs, index_dir, tmp_path):
+    write(docs, 'ipc.txt', 'Section 302 punishment for murder')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    with pytest.raises(NotADirectoryError):
+        index.ingest(tmp_path / 'docs_typo')
+
+    assert sources(CorpusIndex(index_dir), 'murder') == ['ipc.txt']
+
+
+def test_other_folder_needs_replace(docs, index_dir, tmp_path):
+    write(docs, 'ipc.txt', 'Section 302 punishment for murder')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+    other = tmp_path / 'other'
+    other.mkdir()
+    write(other, 'rent.txt', 'Tenancy eviction of a tenant')
+
+    with pytest.raises(ValueError):
+        index.ingest(other)
+    assert sources(index, 'murder') == ['ipc.txt']
+
+    index.ingest(other, replace=True)
+    assert sources(index, 'murder') == []
+    assert sources(index, 'eviction') == ['rent.txt']
+
+
+def test_scan_budget_keeps_rare_terms(docs, index_dir, monkeypatch):
+    for i in range(20):
+        write(docs, f'common{i}.txt', 'court order')
+    write(docs, 'rare.txt', 'court order on dowry')
+    index = CorpusIndex(index_dir)
+    index.ingest(docs)
+
+    # Too small for 'court' and 'order', but the rare term is scanned first
+    monkeypatch.setattr(corpus, 'MAX_POSTINGS_SCANNED', 6)
+    assert sources(index, 'court order dowry', k=1) == ['rare.txt']
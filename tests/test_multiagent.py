@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+import multiagent
+from corpus import CorpusIndex
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    index_dir = str(tmp_path / 'index')
+    monkeypatch.setenv('CORPUS_INDEX_DIR', index_dir)
+    monkeypatch.setattr(multiagent, 'corpus', None)
+    monkeypatch.setattr(multiagent, 'corpus_version', None)
+    return index_dir
+
+
+def build(tmp_path, index_dir, files):
+    docs = tmp_path / 'docs'
+    docs.mkdir(exist_ok=True)
+    for name, text in files.items():
+        (docs / name).write_text(text, encoding='utf-8')
+    CorpusIndex(index_dir).ingest(docs)
+
+
+def test_grounding_without_index(index_dir):
+    assert multiagent.get_corpus() is None
+    assert multiagent.criminal_lawyer.grounding('bail') == ''
+
+
+def test_grounding_includes_passages(tmp_path, index_dir):
+    build(tmp_path, index_dir, {'crpc.txt': 'Section 437 bail in non-bailable offences'})
+
+    grounding = multiagent.criminal_lawyer.grounding('when is bail granted')
+
+    assert '[crpc.txt]' in grounding
+    assert 'Section 437' in grounding
+
+
+def test_outdated_index_falls_back_to_ungrounded(tmp_path, index_dir):
+    build(tmp_path, index_dir, {'crpc.txt': 'Section 437 bail in non-bailable offences'})
+    manifest_path = os.path.join(index_dir, 'manifest.json')
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['version'] = 0
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    assert multiagent.get_corpus() is None
+    assert multiagent.criminal_lawyer.grounding('bail') == ''
+
+
+def test_unreadable_index_falls_back_to_ungrounded(index_dir):
+    os.makedirs(index_dir)
+    with open(os.path.join(index_dir, 'manifest.json'), 'w') as f:
+        f.write('{not json')
+
+    assert multiagent.get_corpus() is None
+    assert multiagent.criminal_lawyer.grounding('bail') == ''
+
+
+def test_reingest_is_picked_up_without_restart(tmp_path, index_dir):
+    build(tmp_path, index_dir, {'crpc.txt': 'Section 437 bail in non-bailable offences'})
+    first = multiagent.get_corpus()
+    assert multiagent.get_corpus() is first
+
+    build(tmp_path, index_dir, {'ipc.txt': 'Section 304B dowry death'})
+    # Make sure the manifest looks changed even on filesystems with coarse mtimes
+    manifest_path = os.path.join(index_dir, 'manifest.json')
+    mtime = os.stat(manifest_path).st_mtime
+    os.utime(manifest_path, (mtime + 5, mtime + 5))
+
+    assert multiagent.get_corpus() is not first
+    assert '[ipc.txt]' in multiagent.criminal_lawyer.grounding('dowry death')